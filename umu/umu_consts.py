@@ -26,14 +26,16 @@ STEAM_COMPAT: Path = Path.home().joinpath(
     ".local", "share", "Steam", "compatibilitytools.d"
 )
 
-PROTON_VERBS = {
-    "waitforexitandrun",
-    "run",
-    "runinprefix",
-    "destroyprefix",
-    "getcompatpath",
-    "getnativepath",
-}
+PROTON_VERBS = frozenset(
+    {
+        "waitforexitandrun",
+        "run",
+        "runinprefix",
+        "destroyprefix",
+        "getcompatpath",
+        "getnativepath",
+    }
+)
 
 FLATPAK_ID = os.environ.get("FLATPAK_ID") or ""
 
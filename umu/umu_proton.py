@@ -1,15 +1,19 @@
 import os
 import sys
 from concurrent.futures import Future, ThreadPoolExecutor
+from gzip import decompress
 from hashlib import sha512
 from http.client import HTTPException
+from io import BufferedIOBase
 from json import loads
 from pathlib import Path
-from shutil import rmtree
+from shutil import rmtree, which
 from ssl import SSLContext, create_default_context
+from subprocess import DEVNULL, PIPE, Popen
+from tarfile import ReadError, TarError, TarFile
 from tarfile import open as tar_open
 from tempfile import mkdtemp
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.error import URLError
 from urllib.request import Request, urlopen
 
@@ -17,8 +21,14 @@ from umu_consts import STEAM_COMPAT
 from umu_log import log
 from umu_util import run_zenity
 
+if TYPE_CHECKING:
+    from _typeshed import WriteableBuffer
+
 ssl_default_context: SSLContext = create_default_context()
 
+# Names of the UMU-Proton builds, which will be removed when updating
+UMU_PROTONS: tuple[str, str] = ("UMU-Proton", "ULWGL-Proton")
+
 try:
     from tarfile import tar_filter
 
@@ -61,7 +71,7 @@ def get_umu_proton(
     if _get_from_steamcompat(env, STEAM_COMPAT) is env:
         return env
 
-    os.environ["PROTONPATH"] = ""
+    env["PROTONPATH"] = ""
 
     return env
 
@@ -77,6 +87,7 @@ def _fetch_releases() -> tuple[tuple[str, str], tuple[str, str]] | tuple[()]:
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28",
         "User-Agent": "",
+        "Accept-Encoding": "gzip",
     }
 
     if os.environ.get("PROTONPATH") == "GE-Proton":
@@ -87,26 +98,30 @@ def _fetch_releases() -> tuple[tuple[str, str], tuple[str, str]] | tuple[()]:
         context=ssl_default_context,
     ) as resp:
         releases: list[dict[str, Any]]
+        data: bytes
 
         if resp.status != 200:
             return ()
 
-        releases = loads(resp.read().decode("utf-8")).get("assets", [])
+        data = resp.read()
+
+        # Github will compress the response when requested
+        if resp.headers.get("Content-Encoding") == "gzip":
+            data = decompress(data)
+
+        releases = loads(data).get("assets", [])
 
         for release in releases:
-            if release["name"].endswith("sum"):
-                digest_asset = (
-                    release["name"],
-                    release["browser_download_url"],
-                )
+            name: str = release["name"]
+            asset_url: str = release["browser_download_url"]
+
+            if name.endswith("sum"):
+                digest_asset = (name, asset_url)
                 asset_count += 1
-            elif release["name"].endswith("tar.gz") and release[
-                "name"
-            ].startswith(("UMU-Proton", "GE-Proton")):
-                proton_asset = (
-                    release["name"],
-                    release["browser_download_url"],
-                )
+            elif name.endswith(".tar.gz") and name.startswith(
+                ("UMU-Proton", "GE-Proton")
+            ):
+                proton_asset = (name, asset_url)
                 asset_count += 1
 
             if asset_count == 2:
@@ -120,16 +135,21 @@ def _fetch_releases() -> tuple[tuple[str, str], tuple[str, str]] | tuple[()]:
 
 
 def _fetch_proton(
-    env: dict[str, str],
     tmp: Path,
+    steam_compat: Path,
     assets: tuple[tuple[str, str], tuple[str, str]],
-) -> dict[str, str]:
-    """Download the latest UMU-Proton or GE-Proton."""
+    thread_pool: ThreadPoolExecutor,
+) -> None:
+    """Download and extract the latest UMU-Proton or GE-Proton.
+
+    When downloaded from Python, the archive is extracted and verified as it
+    is being downloaded, without ever being written to disk.
+    """
     hash, hash_url = assets[0]
     tarball, tar_url = assets[1]
     proton: str = tarball.removesuffix(".tar.gz")
     ret: int = 0  # Exit code from zenity
-    digest: str = ""  # Digest of the Proton archive
+    future: Future[str]  # Digest of the Proton archive
 
     # Verify the scheme from Github for resources
     if not tar_url.startswith("https:") or not hash_url.startswith("https:"):
@@ -137,22 +157,9 @@ def _fetch_proton(
         raise ValueError(err)
 
     # Digest file
-    # Since the URLs are not hardcoded links, Ruff will flag the urlopen call
-    # See https://github.com/astral-sh/ruff/issues/7918
+    # Download it in the background while the archive is being downloaded
     log.console(f"Downloading {hash}...")
-    with (
-        urlopen(hash_url, context=ssl_default_context) as resp,  # noqa: S310
-    ):
-        if resp.status != 200:
-            err: str = (
-                f"Unable to download {hash}\n"
-                f"github.com returned the status: {resp.status}"
-            )
-            raise HTTPException(err)
-
-        for line in resp.read().decode("utf-8").splitlines():
-            if line.endswith(tarball):
-                digest = line.split(" ")[0]
+    future = thread_pool.submit(_fetch_digest, hash, hash_url, tarball)
 
     # Proton
     # Create a popup with zenity when the env var is set
@@ -173,55 +180,277 @@ def _fetch_proton(
         log.warning("zenity exited with the status code: %s", ret)
         log.console("Retrying from Python...")
 
-    if not os.environ.get("UMU_ZENITY") or ret:
-        log.console(f"Downloading {tarball}...")
-        with (
-            urlopen(  # noqa: S310
-                tar_url, context=ssl_default_context
-            ) as resp,
-        ):
-            hashsum = sha512()
-
-            # Crash here because without Proton, the launcher will not work
-            if resp.status != 200:
-                err: str = (
-                    f"Unable to download {tarball}\n"
-                    f"github.com returned the status: {resp.status}"
+    # Only the archive downloaded by curl is written to the cache
+    if os.environ.get("UMU_ZENITY") == "1" and not ret:
+        try:
+            with tmp.joinpath(tarball).open(mode="rb") as file:
+                _extract_digest(
+                    file, tmp.joinpath(tarball), steam_compat, future
                 )
-                raise HTTPException(err)
+        finally:
+            log.debug("Removing: %s", tarball)
+            tmp.joinpath(tarball).unlink(missing_ok=True)
+        return
 
-            with tmp.joinpath(tarball).open(mode="ab+", buffering=0) as file:
-                chunk_size: int = 64 * 1024  # 64 KB
-                buffer: bytearray = bytearray(chunk_size)
-                view: memoryview = memoryview(buffer)
-                while size := resp.readinto(buffer):
-                    file.write(view[:size])
-                    hashsum.update(view[:size])
+    log.console(f"Downloading {tarball}...")
+    with (
+        urlopen(  # noqa: S310
+            tar_url, context=ssl_default_context
+        ) as resp,
+    ):
+        # Crash here because without Proton, the launcher will not work
+        if resp.status != 200:
+            err: str = (
+                f"Unable to download {tarball}\n"
+                f"github.com returned the status: {resp.status}"
+            )
+            raise HTTPException(err)
 
-            if hashsum.hexdigest() != digest:
-                err: str = f"Digest mismatched: {tarball}"
-                raise ValueError(err)
+        _extract_digest(resp, tmp.joinpath(tarball), steam_compat, future)
 
-            log.console(f"{tarball}: SHA512 is OK")
 
-    return env
+def _fetch_digest(hash: str, hash_url: str, tarball: str) -> str:
+    """Download the digest file and return the digest of the Proton archive."""
+    digest: str = ""
 
+    # Since the URLs are not hardcoded links, Ruff will flag the urlopen call
+    # See https://github.com/astral-sh/ruff/issues/7918
+    with (
+        urlopen(hash_url, context=ssl_default_context) as resp,  # noqa: S310
+    ):
+        if resp.status != 200:
+            err: str = (
+                f"Unable to download {hash}\n"
+                f"github.com returned the status: {resp.status}"
+            )
+            raise HTTPException(err)
+
+        for line in resp.read().decode("utf-8").splitlines():
+            if line.endswith(tarball):
+                digest = line.split(" ")[0]
+
+    return digest
+
+
+def _extract_digest(
+    fileobj: BufferedIOBase,
+    file: Path,
+    steam_compat: Path,
+    future: Future[str],
+) -> None:
+    """Extract an archive from a stream and verify it against its digest.
+
+    The archive is hashed in the same pass that it is extracted. It is
+    extracted to a temporary directory in steam_compat, and its Proton is only
+    moved into place after its digest was verified. Otherwise, a partial or
+    unverified build would be used in the next run if the launcher is killed.
+    """
+    reader: _DigestReader = _DigestReader(fileobj)
+    proton: str = file.name.removesuffix(".tar.gz")
+    staging: Path = Path(mkdtemp(dir=steam_compat))
+
+    try:
+        try:
+            _extract_dir(file, staging, reader)
+        except TarError:
+            # A corrupted archive is likely to fail before it's verified
+            if reader.hexdigest() == future.result():
+                raise
+
+        if reader.hexdigest() != future.result():
+            err: str = f"Digest mismatched: {file.name}"
+            raise ValueError(err)
+
+        log.console(f"{file.name}: SHA512 is OK")
+        staging.joinpath(proton).rename(steam_compat.joinpath(proton))
+    finally:
+        log.debug("Removing: %s", staging)
+        rmtree(str(staging))
+
+
+class _DigestReader(BufferedIOBase):
+    """Compute the SHA512 digest of a binary stream as it is being read."""
+
+    def __init__(self, fileobj: BufferedIOBase) -> None:
+        self._fileobj = fileobj
+        self._hash = sha512()
+
+    def readable(self) -> bool:
+        """Return True since the stream is always opened for reading."""
+        return True
+
+    def read(self, size: int | None = -1, /) -> bytes:
+        """Read from the stream and update the digest."""
+        data: bytes = self._fileobj.read(size)
+        self._hash.update(data)
+        return data
+
+    def readinto(self, buffer: "WriteableBuffer", /) -> int:
+        """Read from the stream into a buffer and update the digest."""
+        size: int = self._fileobj.readinto(buffer)
+        self._hash.update(memoryview(buffer)[:size])
+        return size
+
+    def hexdigest(self) -> str:
+        """Read the remainder of the stream and return its digest.
+
+        An extractor can stop reading once it reaches the end of an archive,
+        leaving trailing data (e.g., padding) that is part of the digest.
+        """
+        chunk_size: int = 1024 * 1024  # 1 MB
+        buffer: bytearray = bytearray(chunk_size)
+        while self.readinto(buffer):
+            pass
+
+        return self._hash.hexdigest()
+
+
+def _extract_dir(
+    file: Path, steam_compat: Path, fileobj: BufferedIOBase | None = None
+) -> None:
+    """Extract from a path to another location.
+
+    When a file object is passed, the archive will be read from it rather than
+    from the path. When bsdtar is available, libarchive will be used to
+    extract the archive in a separate process as it is being read. Otherwise,
+    when pigz or gzip is available, the archive will be decompressed in a
+    separate process and its output will be extracted as a stream.
+    """
+    bsdtar: str
+    unzip: str
+
+    if fileobj is None:
+        with file.open(mode="rb") as fp:
+            _extract_dir(file, steam_compat, fp)
+        return
 
-def _extract_dir(file: Path, steam_compat: Path) -> None:
-    """Extract from a path to another location."""
-    with tar_open(file, "r:gz") as tar:
-        if has_data_filter:
-            log.debug("Using filter for archive")
-            tar.extraction_filter = tar_filter
-        else:
-            log.warning("Python: %s", sys.version)
-            log.warning("Using no data filter for archive")
-            log.warning("Archive will be extracted insecurely")
+    bsdtar = which("bsdtar") or ""
+    unzip = which("pigz") or which("gzip") or ""
 
-        log.console(f"Extracting '{file}' -> '{steam_compat}'...")
-        # TODO: Rather than extracting all of the contents, we should prefer
-        # the difference (e.g., rsync)
-        tar.extractall(path=steam_compat)  # noqa: S202
+    if bsdtar:
+        _extract_bsdtar(bsdtar, fileobj, file, steam_compat)
+    elif unzip:
+        _extract_gzip(unzip, fileobj, file, steam_compat)
+    else:
+        with tar_open(file, "r|gz", fileobj=fileobj) as tar:
+            _extract_tar(tar, file, steam_compat)
+
+
+def _extract_gzip(
+    unzip: str, fileobj: BufferedIOBase, file: Path, steam_compat: Path
+) -> None:
+    """Extract an archive read from a stream after decompressing it.
+
+    The stream is written to pigz or gzip in a separate thread while its output
+    is being extracted, so that reading the stream will not block extracting.
+    """
+    chunk_size: int = 1024 * 1024  # 1 MB
+
+    log.debug("Decompressing archive with: %s", unzip)
+    with (
+        Popen([unzip, "-dc"], stdin=PIPE, stdout=PIPE, stderr=DEVNULL) as proc,
+        ThreadPoolExecutor(max_workers=1) as writer,
+    ):
+        future: Future[None] = writer.submit(_write_stdin, proc, fileobj)
+        try:
+            with tar_open(fileobj=proc.stdout, mode="r|") as tar:
+                _extract_tar(tar, file, steam_compat)
+            # Read the output after the end of the archive, so the process
+            # can exit after the remainder of the stream was written to it
+            while proc.stdout and proc.stdout.read(chunk_size):
+                pass
+        except ReadError:
+            # Stop reading from the process and check if it failed to inflate
+            if proc.stdout:
+                proc.stdout.close()
+            if not proc.wait():
+                raise
+        finally:
+            # Never leave the process blocked on its output, or it will block
+            # writing the stream to it as well
+            if proc.stdout:
+                proc.stdout.close()
+
+        # Raise any error that occurred while reading the stream
+        future.result()
+
+    if proc.returncode:
+        err: str = f"File is not a valid gzip archive: '{file}'"
+        raise ReadError(err)
+
+
+def _write_stdin(proc: Popen[bytes], fileobj: BufferedIOBase) -> None:
+    """Write a stream to the standard input of a process, then close it."""
+    chunk_size: int = 1024 * 1024  # 1 MB
+    buffer: bytearray = bytearray(chunk_size)
+    view: memoryview = memoryview(buffer)
+
+    if not proc.stdin:
+        return
+
+    try:
+        with proc.stdin:
+            while size := fileobj.readinto(buffer):
+                proc.stdin.write(view[:size])
+    except BrokenPipeError:
+        # The process exited before the end of the stream
+        log.debug("%s stopped reading the archive", proc.args)
+
+
+def _extract_bsdtar(
+    bsdtar: str, fileobj: BufferedIOBase, file: Path, steam_compat: Path
+) -> None:
+    """Extract an archive read from a stream to a directory with bsdtar.
+
+    By default, bsdtar will refuse to extract members with absolute paths,
+    '..' components or paths that would be altered by a symbolic link.
+    """
+    chunk_size: int = 1024 * 1024  # 1 MB
+    buffer: bytearray = bytearray(chunk_size)
+    view: memoryview = memoryview(buffer)
+    size: int = fileobj.readinto(buffer)
+
+    # libarchive detects the format, but we only expect .tar.gz releases
+    if view[:2] != b"\x1f\x8b":
+        err: str = f"File is not a valid gzip archive: '{file}'"
+        raise ReadError(err)
+
+    log.debug("Extracting archive with: %s", bsdtar)
+    log.console(f"Extracting '{file}' -> '{steam_compat}'...")
+    with Popen(
+        [bsdtar, "-x", "-f", "-", "-C", steam_compat], stdin=PIPE, bufsize=0
+    ) as proc:
+        try:
+            while size and proc.stdin:
+                written: int = 0
+                # Writes to an unbuffered pipe can be partial
+                while written < size:
+                    written += proc.stdin.write(view[written:size])
+                size = fileobj.readinto(buffer)
+        except BrokenPipeError:
+            # bsdtar exited before the end of the stream. Either an error
+            # occurred or it found the end of the archive
+            log.debug("%s stopped reading the archive", bsdtar)
+
+    if proc.returncode:
+        err: str = f"{bsdtar} exited with the status code: {proc.returncode}"
+        raise ReadError(err)
+
+
+def _extract_tar(tar: TarFile, file: Path, steam_compat: Path) -> None:
+    """Extract the members of an opened archive to a directory."""
+    if has_data_filter:
+        log.debug("Using filter for archive")
+        tar.extraction_filter = tar_filter
+    else:
+        log.warning("Python: %s", sys.version)
+        log.warning("Using no data filter for archive")
+        log.warning("Archive will be extracted insecurely")
+
+    log.console(f"Extracting '{file}' -> '{steam_compat}'...")
+    # Each release is extracted to a new directory named after its version,
+    # which never exists beforehand, so there is no previous state to diff
+    tar.extractall(path=steam_compat)  # noqa: S202
 
 
 def _cleanup(tarball: str, proton: str, tmp: Path, steam_compat: Path) -> None:
@@ -256,15 +485,15 @@ def _get_from_steamcompat(
     )
 
     try:
-        latest: Path = max(
-            proton
-            for proton in steam_compat.glob("*")
-            if proton.name.startswith(version)
-        )
-        log.console(f"{latest.name} found in: '{steam_compat}'")
-        log.console(f"Using {latest.name}")
-        os.environ["PROTONPATH"] = str(latest)
-        env["PROTONPATH"] = os.environ["PROTONPATH"]
+        with os.scandir(steam_compat) as entries:
+            latest: str = max(
+                entry.name
+                for entry in entries
+                if entry.name.startswith(version)
+            )
+        log.console(f"{latest} found in: '{steam_compat}'")
+        log.console(f"Using {latest}")
+        env["PROTONPATH"] = str(steam_compat.joinpath(latest))
     except ValueError:
         return None
 
@@ -311,42 +540,37 @@ def _get_latest(
         log.console(f"{version} is up to date")
         steam_compat.joinpath("UMU-Latest").unlink(missing_ok=True)
         steam_compat.joinpath("UMU-Latest").symlink_to(proton)
-        os.environ["PROTONPATH"] = str(steam_compat.joinpath(proton))
-        env["PROTONPATH"] = os.environ["PROTONPATH"]
+        env["PROTONPATH"] = str(steam_compat.joinpath(proton))
         return env
 
     # Use the latest UMU/GE-Proton
     try:
-        _fetch_proton(env, tmp, assets)
+        # Previous builds, excluding the one about to be extracted
+        protons: list[os.DirEntry] = []
+        if version == "UMU-Proton":
+            with os.scandir(steam_compat) as entries:
+                protons = [
+                    entry
+                    for entry in entries
+                    if entry.name.startswith(UMU_PROTONS)
+                ]
+
+        _fetch_proton(tmp, steam_compat, assets, thread_pool)
+
+        # Only remove previous builds after the latest has been verified
         if version == "UMU-Proton":
-            protons: list[Path] = [
-                file
-                for file in steam_compat.glob("*")
-                if file.name.startswith(("UMU-Proton", "ULWGL-Proton"))
-            ]
             log.debug("Updating UMU-Proton")
-            future: Future = thread_pool.submit(
-                _update_proton, proton, steam_compat, protons, thread_pool
-            )
-            _extract_dir(tmp.joinpath(tarball), steam_compat)
-            future.result()
-        else:
-            _extract_dir(tmp.joinpath(tarball), steam_compat)
-        os.environ["PROTONPATH"] = str(steam_compat.joinpath(proton))
-        env["PROTONPATH"] = os.environ["PROTONPATH"]
-        log.debug("Removing: %s", tarball)
-        thread_pool.submit(tmp.joinpath(tarball).unlink, True)
+            _update_proton(proton, steam_compat, protons, thread_pool)
+        env["PROTONPATH"] = str(steam_compat.joinpath(proton))
         log.console(f"Using {version} ({proton})")
-    except ValueError as e:  # Digest mismatched
+    except (ValueError, TarError) as e:  # Digest mismatched or bad archive
         log.exception(e)
-        # Since we do not want the user to use a suspect file, delete it
-        tmp.joinpath(tarball).unlink(missing_ok=True)
         return None
     except KeyboardInterrupt:  # ctrl+c or signal sent from parent proc
         # Clean up extracted data in compatibilitytools.d and temporary dir
         _cleanup(tarball, proton, tmp, steam_compat)
         return None
-    except HTTPException as e:  # Download failed
+    except (HTTPException, OSError) as e:  # Download failed
         log.exception(e)
         return None
 
@@ -356,7 +580,7 @@ def _get_latest(
 def _update_proton(
     proton: str,
     steam_compat: Path,
-    protons: list[Path],
+    protons: list[os.DirEntry],
     thread_pool: ThreadPoolExecutor,
 ) -> None:
     """Create a symbolic link and remove the previous UMU-Proton.
@@ -379,10 +603,10 @@ def _update_proton(
         return
 
     for stable in protons:
-        if stable.is_dir():
+        if stable.is_dir(follow_symlinks=False):
             log.debug("Previous stable build found")
-            log.debug("Removing: %s", stable)
-            futures.append(thread_pool.submit(rmtree, str(stable)))
+            log.debug("Removing: %s", stable.path)
+            futures.append(thread_pool.submit(rmtree, stable.path))
 
     for _ in futures:
         _.result()
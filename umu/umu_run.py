@@ -65,19 +65,18 @@ def parse_args() -> Namespace | tuple[str, list[str]]:  # noqa: D103
         sys.exit(1)
 
     # Winetricks
-    # Exit if no winetricks verbs were passed
-    if sys.argv[1].endswith("winetricks") and not sys.argv[2:]:
-        err: str = "No winetricks verb specified"
-        log.error(err)
-        sys.exit(1)
-
-    # Exit if argument is not a verb
-    if sys.argv[1].endswith("winetricks") and not is_winetricks_verb(
-        sys.argv[2:]
-    ):
-        sys.exit(1)
-
-    if sys.argv[1:][0] in opt_args:
+    if sys.argv[1].endswith("winetricks"):
+        # Exit if no winetricks verbs were passed
+        if not sys.argv[2:]:
+            err: str = "No winetricks verb specified"
+            log.error(err)
+            sys.exit(1)
+
+        # Exit if argument is not a verb
+        if not is_winetricks_verb(sys.argv[2:]):
+            sys.exit(1)
+
+    if sys.argv[1] in opt_args:
         return parser.parse_args(sys.argv[1:])
 
     if sys.argv[1] in PROTON_VERBS:
@@ -162,14 +161,13 @@ def check_env(env: dict[str, str]) -> dict[str, str] | dict[str, Any]:
     if "WINEPREFIX" not in os.environ:
         pfx: Path = Path.home().joinpath("Games", "umu", env["GAMEID"])
         pfx.mkdir(parents=True, exist_ok=True)
-        os.environ["WINEPREFIX"] = str(pfx)
-
-    if not Path(os.environ["WINEPREFIX"]).expanduser().is_dir():
+        env["WINEPREFIX"] = str(pfx)
+    elif not Path(os.environ["WINEPREFIX"]).expanduser().is_dir():
         pfx: Path = Path(os.environ["WINEPREFIX"])
         pfx.mkdir(parents=True, exist_ok=True)
-        os.environ["WINEPREFIX"] = str(pfx)
-
-    env["WINEPREFIX"] = os.environ["WINEPREFIX"]
+        env["WINEPREFIX"] = str(pfx)
+    else:
+        env["WINEPREFIX"] = os.environ["WINEPREFIX"]
 
     # Proton Version
     if (
@@ -177,23 +175,19 @@ def check_env(env: dict[str, str]) -> dict[str, str] | dict[str, Any]:
         and Path(STEAM_COMPAT, os.environ["PROTONPATH"]).is_dir()
     ):
         log.debug("Proton version selected")
-        os.environ["PROTONPATH"] = str(
+        env["PROTONPATH"] = str(
             STEAM_COMPAT.joinpath(os.environ["PROTONPATH"])
         )
-
-    # GE-Proton
-    if os.environ.get("PROTONPATH") == "GE-Proton":
+    elif os.environ.get("PROTONPATH") == "GE-Proton":
         log.debug("GE-Proton selected")
         get_umu_proton(env, thread_pool)
-
-    if "PROTONPATH" not in os.environ:
-        os.environ["PROTONPATH"] = ""
+    elif "PROTONPATH" not in os.environ:
         get_umu_proton(env, thread_pool)
-
-    env["PROTONPATH"] = os.environ["PROTONPATH"]
+    else:
+        env["PROTONPATH"] = os.environ["PROTONPATH"]
 
     # If download fails/doesn't exist in the system, raise an error
-    if not os.environ["PROTONPATH"]:
+    if not env["PROTONPATH"]:
         err: str = (
             "Download failed\n"
             "UMU-Proton could not be found in compatibilitytools.d\n"
@@ -226,10 +220,8 @@ def set_env(
 
     # PROTON_VERB
     # For invalid Proton verbs, just assign the waitforexitandrun
-    if os.environ.get("PROTON_VERB") in PROTON_VERBS:
-        env["PROTON_VERB"] = os.environ["PROTON_VERB"]
-    else:
-        env["PROTON_VERB"] = "waitforexitandrun"
+    verb: str = os.environ.get("PROTON_VERB", "")
+    env["PROTON_VERB"] = verb if verb in PROTON_VERBS else "waitforexitandrun"
 
     # EXE
     if is_createpfx:
@@ -508,29 +500,14 @@ def run_command(command: list[AnyPath]) -> int:
 
 def main() -> int:  # noqa: D103
     future: Future | None = None
+    # Variables are added once they have been assigned a value. Variables that
+    # are never or only conditionally assigned start empty, so that they still
+    # clear any value inherited from the parent environment
     env: dict[str, str] = {
-        "WINEPREFIX": "",
-        "GAMEID": "",
         "PROTON_CRASH_REPORT_DIR": "/tmp/umu_crashreports",
-        "PROTONPATH": "",
-        "STEAM_COMPAT_APP_ID": "",
-        "STEAM_COMPAT_TOOL_PATHS": "",
         "STEAM_COMPAT_LIBRARY_PATHS": "",
-        "STEAM_COMPAT_MOUNTS": "",
-        "STEAM_COMPAT_INSTALL_PATH": "",
         "STEAM_COMPAT_CLIENT_INSTALL_PATH": "",
-        "STEAM_COMPAT_DATA_PATH": "",
-        "STEAM_COMPAT_SHADER_PATH": "",
         "FONTCONFIG_PATH": "",
-        "EXE": "",
-        "SteamAppId": "",
-        "SteamGameId": "",
-        "STEAM_RUNTIME_LIBRARY_PATH": "",
-        "STORE": "",
-        "PROTON_VERB": "",
-        "UMU_ID": "",
-        "ULWGL_ID": "",
-        "UMU_ZENITY": "",
         "UMU_NO_RUNTIME": "",
     }
     command: list[AnyPath] = []
@@ -603,9 +580,9 @@ def main() -> int:  # noqa: D103
 
     # Set all environment variables
     # NOTE: `env` after this block should be read only
-    for key, val in env.items():
-        log.info("%s=%s", key, val)
-        os.environ[key] = val
+    if log.isEnabledFor(INFO):
+        log.info("%s", "\n".join(f"{key}={val}" for key, val in env.items()))
+    os.environ.update(env)
 
     if future:
         future.result()
@@ -1,4 +1,7 @@
 import argparse
+import gzip
+import hashlib
+import io
 import json
 import os
 import re
@@ -6,9 +9,10 @@ import tarfile
 import unittest
 from argparse import Namespace
 from concurrent.futures import ThreadPoolExecutor
+from http.client import IncompleteRead
 from pathlib import Path
 from pwd import getpwuid
-from shutil import copy, copytree, rmtree
+from shutil import copy, copytree, rmtree, which
 from subprocess import CompletedProcess
 from unittest.mock import MagicMock, patch
 
@@ -614,6 +618,45 @@ class TestGameLauncher(unittest.TestCase):
         )
         self.assertIsInstance(result, dict, "Expected a dict")
 
+    def test_fetch_releases_gzip(self):
+        """Test _fetch_releases when Github returns a compressed response.
+
+        The response body should be decompressed before the assets of the
+        release are read
+        """
+        result = None
+        release = {
+            "assets": [
+                {
+                    "name": "UMU-Proton-9.0-beta16.sha512sum",
+                    "browser_download_url": "https://foo/sum",
+                },
+                {
+                    "name": "UMU-Proton-9.0-beta16.tar.gz",
+                    "browser_download_url": "https://foo/tar",
+                },
+            ]
+        }
+        mock_resp = MagicMock()
+        mock_resp.status = 200
+        mock_resp.headers = {"Content-Encoding": "gzip"}
+        mock_resp.read.return_value = gzip.compress(
+            json.dumps(release).encode("utf-8")
+        )
+        mock_resp.__enter__.return_value = mock_resp
+
+        with patch.object(umu_proton, "urlopen", return_value=mock_resp):
+            result = umu_proton._fetch_releases()
+
+        self.assertEqual(
+            result,
+            (
+                ("UMU-Proton-9.0-beta16.sha512sum", "https://foo/sum"),
+                ("UMU-Proton-9.0-beta16.tar.gz", "https://foo/tar"),
+            ),
+            "Expected the digest and Proton assets",
+        )
+
     def test_latest_interrupt(self):
         """Test _get_latest when the user interrupts the download/extraction.
 
@@ -662,14 +705,10 @@ class TestGameLauncher(unittest.TestCase):
         Assumes a file is being downloaded in this case
 
         A ValueError should be raised, and one case it can happen is if the
-        digests mismatched for some reason
+        digests mismatched for some reason. Only the archive downloaded by
+        curl is written to the cache
         """
         result = None
-        # In the real usage, should be populated after successful callout for
-        # latest Proton releases
-        # When empty, it means the callout failed for some reason (e.g. no
-        # internet)
-        files = (("", ""), (self.test_archive.name, ""))
         thread_pool = ThreadPoolExecutor()
 
         self.assertTrue(
@@ -677,11 +716,18 @@ class TestGameLauncher(unittest.TestCase):
             "Expected test file in cache to exist",
         )
 
-        with patch("umu_proton._fetch_proton") as mock_function:
-            # Mock the interrupt
-            mock_function.side_effect = ValueError
+        with (
+            # Mock the archive downloaded by curl
+            patch.dict(os.environ, {"UMU_ZENITY": "1"}),
+            patch.object(umu_proton, "run_zenity", return_value=0),
+            self._patch_urlopen(digest="foo"),
+        ):
             result = umu_proton._get_latest(
-                self.env, self.test_compat, self.test_cache, files, thread_pool
+                self.env,
+                self.test_compat,
+                self.test_cache,
+                self._fetch_assets(),
+                thread_pool,
             )
             self.assertFalse(
                 self.env["PROTONPATH"], "Expected PROTONPATH to be empty"
@@ -858,6 +904,152 @@ class TestGameLauncher(unittest.TestCase):
         Path(f"{latest}.sha512sum").unlink()
         thread_pool.shutdown()
 
+    def test_latest_digest_mismatch(self):
+        """Test _get_latest when the digest of the extracted Proton mismatched.
+
+        The archive is verified while it is being extracted, so the extracted
+        Proton should be removed. Old stable versions should not be removed
+        before the latest Proton is verified
+        """
+        result = None
+        thread_pool = ThreadPoolExecutor()
+
+        # Mock an old version
+        self.test_compat.joinpath("UMU-Proton-9.0-beta15").mkdir()
+
+        os.environ["PROTONPATH"] = ""
+
+        with self._patch_urlopen(digest="foo"):
+            result = umu_proton._get_latest(
+                self.env,
+                self.test_compat,
+                self.test_cache,
+                self._fetch_assets(),
+                thread_pool,
+            )
+        self.assertFalse(result, "Expected None when a ValueError occurs")
+        self.assertFalse(
+            self.env["PROTONPATH"], "Expected PROTONPATH to be empty"
+        )
+        self.assertEqual(
+            [entry.name for entry in self.test_compat.iterdir()],
+            ["UMU-Proton-9.0-beta15"],
+            "Expected only the old version to survive",
+        )
+
+        thread_pool.shutdown()
+
+    def test_latest_digest_err(self):
+        """Test _get_latest when the digest file failed to download.
+
+        The digest is only resolved after the archive was extracted, so the
+        unverified Proton should be removed
+        """
+        result = None
+        thread_pool = ThreadPoolExecutor()
+
+        os.environ["PROTONPATH"] = ""
+
+        with self._patch_urlopen(digest_status=404):
+            result = umu_proton._get_latest(
+                self.env,
+                self.test_compat,
+                self.test_cache,
+                self._fetch_assets(),
+                thread_pool,
+            )
+        self.assertFalse(result, "Expected None when the digest failed")
+        self.assertFalse(
+            any(self.test_compat.iterdir()),
+            "Expected no unverified Proton or staging dir in compat",
+        )
+
+        thread_pool.shutdown()
+
+    def test_latest_truncated(self):
+        """Test _get_latest when the download of the archive was interrupted.
+
+        Neither a truncated body nor a reset connection should be raised to
+        the caller, and the partially extracted Proton should be removed
+        """
+        result = None
+        thread_pool = ThreadPoolExecutor()
+
+        # Mock a release large enough to be partially extracted
+        self.test_proton_dir.joinpath("user_settings.py").write_bytes(
+            os.urandom(1024 * 1024)
+        )
+        with tarfile.open(self.test_archive.as_posix(), "w:gz") as tar:
+            tar.add(
+                self.test_proton_dir.as_posix(),
+                arcname=self.test_proton_dir.as_posix(),
+            )
+        data = self.test_archive.read_bytes()
+
+        os.environ["PROTONPATH"] = ""
+
+        for err in (
+            IncompleteRead(data[: len(data) // 2]),
+            ConnectionResetError(),
+        ):
+            with (
+                self.subTest(err=err),
+                self._patch_urlopen(
+                    data=data[: len(data) // 2], archive_err=err
+                ),
+            ):
+                result = umu_proton._get_latest(
+                    self.env,
+                    self.test_compat,
+                    self.test_cache,
+                    self._fetch_assets(),
+                    thread_pool,
+                )
+                self.assertFalse(
+                    result, "Expected None when a download failed"
+                )
+                self.assertFalse(
+                    any(self.test_compat.iterdir()),
+                    "Expected no partial Proton or staging dir in compat",
+                )
+
+        thread_pool.shutdown()
+
+    def test_latest_extract_err(self):
+        """Test _get_latest when the extraction failed for a verified archive.
+
+        The error should not be raised to the caller, and the partially
+        extracted Proton should be removed
+        """
+        result = None
+        thread_pool = ThreadPoolExecutor()
+
+        os.environ["PROTONPATH"] = ""
+
+        with (
+            patch.object(
+                umu_proton,
+                "_extract_dir",
+                side_effect=tarfile.ReadError(
+                    "bsdtar exited with the status code: 1"
+                ),
+            ),
+            self._patch_urlopen(),
+        ):
+            result = umu_proton._get_latest(
+                self.env,
+                self.test_compat,
+                self.test_cache,
+                self._fetch_assets(),
+                thread_pool,
+            )
+        self.assertFalse(result, "Expected None when a ReadError occurs")
+        self.assertFalse(
+            self.env["PROTONPATH"], "Expected PROTONPATH to be empty"
+        )
+
+        thread_pool.shutdown()
+
     def test_steamcompat_nodir(self):
         """Test _get_from_steamcompat when Proton doesn't exist in compat dir.
 
@@ -1003,6 +1195,166 @@ class TestGameLauncher(unittest.TestCase):
             "Expected 'proton' to not exist after cleaned",
         )
 
+    def test_fetch_proton(self):
+        """Test _fetch_proton when downloading Proton from Python.
+
+        The archive should be extracted and verified as it is downloaded,
+        without being written to the cache
+        """
+        result = None
+        thread_pool = ThreadPoolExecutor()
+        extract_dir = umu_proton._extract_dir
+
+        def mock_extract_dir(file, steam_compat, fileobj):
+            extract_dir(file, steam_compat, fileobj)
+            self.assertFalse(
+                self.test_compat.joinpath(self.test_proton_dir).exists(),
+                "Expected Proton to not be in compat before it's verified",
+            )
+
+        with (
+            patch.object(
+                umu_proton, "_extract_dir", side_effect=mock_extract_dir
+            ),
+            self._patch_urlopen(),
+        ):
+            # Only download the archive from Python
+            self.test_archive.unlink()
+            result = umu_proton._fetch_proton(
+                self.test_cache,
+                self.test_compat,
+                self._fetch_assets(),
+                thread_pool,
+            )
+
+        self.assertFalse(result, "Expected None after downloading")
+        self.assertTrue(
+            self.test_compat.joinpath(self.test_proton_dir)
+            .joinpath("proton")
+            .exists(),
+            "Expected 'proton' file to exists in the proton dir",
+        )
+        self.assertFalse(
+            self.test_archive.exists(),
+            "Expected archive to not be written to the cache",
+        )
+        thread_pool.shutdown()
+
+    def test_fetch_proton_nobsdtar(self):
+        """Test _fetch_proton when bsdtar does not exist in the system.
+
+        The archive should be extracted as it is downloaded, both with and
+        without pigz or gzip, and the data after the end of the archive should
+        be included in the digest
+        """
+        thread_pool = ThreadPoolExecutor()
+
+        for unzip in (which, lambda _: None):
+            with (
+                self.subTest(unzip=unzip),
+                patch.object(
+                    umu_proton,
+                    "which",
+                    side_effect=lambda cmd, unzip=unzip: (
+                        None if cmd == "bsdtar" else unzip(cmd)
+                    ),
+                ),
+                self._patch_urlopen(),
+            ):
+                umu_proton._fetch_proton(
+                    self.test_cache,
+                    self.test_compat,
+                    self._fetch_assets(),
+                    thread_pool,
+                )
+                self.assertTrue(
+                    self.test_compat.joinpath(self.test_proton_dir)
+                    .joinpath("proton")
+                    .exists(),
+                    "Expected 'proton' file to exists in the proton dir",
+                )
+                rmtree(self.test_compat.joinpath(self.test_proton_dir))
+
+        thread_pool.shutdown()
+
+    def test_fetch_proton_err(self):
+        """Test _fetch_proton when the digest of the archive mismatched.
+
+        A ValueError should be raised after the archive was extracted, and the
+        extracted Proton should be removed
+        """
+        thread_pool = ThreadPoolExecutor()
+
+        with (
+            self.assertRaisesRegex(ValueError, "Digest mismatched"),
+            self._patch_urlopen(digest="foo"),
+        ):
+            umu_proton._fetch_proton(
+                self.test_cache,
+                self.test_compat,
+                self._fetch_assets(),
+                thread_pool,
+            )
+
+        self.assertFalse(
+            any(self.test_compat.iterdir()),
+            "Expected no extracted Proton or staging dir in compat",
+        )
+        thread_pool.shutdown()
+
+    def _fetch_assets(self):
+        """Return the Github assets of the test Proton."""
+        return (
+            (f"{self.test_proton_dir}.sha512sum", "https://foo/sum"),
+            (self.test_archive.name, "https://foo/tar"),
+        )
+
+    def _patch_urlopen(
+        self, digest=None, digest_status=200, data=None, archive_err=None
+    ):
+        """Patch urlopen to serve the digest file and archive of the Proton.
+
+        By default, the test archive and its actual digest are served. When an
+        error is passed, it's raised once the served archive has been read
+        """
+        data = self.test_archive.read_bytes() if data is None else data
+        digest = digest or hashlib.sha512(data).hexdigest()
+
+        def mock_urlopen(url, **_):
+            if url.endswith("sum"):
+                mock_resp = self._mock_urlopen(
+                    f"{digest}  {self.test_archive.name}".encode()
+                )
+                mock_resp.status = digest_status
+                return mock_resp
+            return self._mock_urlopen(data, archive_err)
+
+        return patch.object(umu_proton, "urlopen", side_effect=mock_urlopen)
+
+    def _mock_urlopen(self, data, err=None):
+        """Mock a successful response from urlopen that returns data."""
+        mock_resp = MagicMock()
+        mock_resp.status = 200
+        mock_resp.headers = {}
+        stream = io.BytesIO(data)
+
+        def read(size=-1):
+            chunk = stream.read(size)
+            if err and not chunk:
+                raise err
+            return chunk
+
+        def readinto(buffer):
+            size = stream.readinto(buffer)
+            if err and not size:
+                raise err
+            return size
+
+        mock_resp.read.side_effect = read
+        mock_resp.readinto.side_effect = readinto
+        mock_resp.__enter__.return_value = mock_resp
+        return mock_resp
+
     def test_extract_err(self):
         """Test _extract_dir when passed a non-gzip compressed archive.
 
@@ -1022,6 +1374,45 @@ class TestGameLauncher(unittest.TestCase):
         if test_archive.exists():
             test_archive.unlink()
 
+    def test_extract_nobsdtar(self):
+        """Test _extract_dir when bsdtar does not exist in the system.
+
+        The archive should be decompressed by pigz or gzip and extracted from
+        Python instead
+        """
+        with patch.object(
+            umu_proton,
+            "which",
+            side_effect=lambda cmd: None if cmd == "bsdtar" else which(cmd),
+        ):
+            result = umu_proton._extract_dir(
+                self.test_archive, self.test_compat
+            )
+        self.assertFalse(result, "Expected None after extracting")
+        self.assertTrue(
+            self.test_compat.joinpath(self.test_proton_dir)
+            .joinpath("proton")
+            .exists(),
+            "Expected 'proton' file to exists in the proton dir",
+        )
+
+    def test_extract_nogzip(self):
+        """Test _extract_dir when bsdtar, pigz and gzip do not exist.
+
+        The archive should be decompressed and extracted from Python instead
+        """
+        with patch.object(umu_proton, "which", return_value=None):
+            result = umu_proton._extract_dir(
+                self.test_archive, self.test_compat
+            )
+        self.assertFalse(result, "Expected None after extracting")
+        self.assertTrue(
+            self.test_compat.joinpath(self.test_proton_dir)
+            .joinpath("proton")
+            .exists(),
+            "Expected 'proton' file to exists in the proton dir",
+        )
+
     def test_extract(self):
         """Test _extract_dir.
 
@@ -2512,8 +2903,8 @@ class TestGameLauncher(unittest.TestCase):
             "Expected WINEPREFIX to exist after check_env",
         )
         self.assertEqual(
-            self.env["WINEPREFIX"],
-            os.environ["WINEPREFIX"],
+            Path(self.env["WINEPREFIX"]),
+            Path(os.environ["WINEPREFIX"]),
             "Expected the WINEPREFIX to be set",
         )
 